@@ -0,0 +1,170 @@
+"""
+Created on Mon Oct 19 13:05:00 2026
+"""
+
+""" Function(s) to score new candidates with a set of trained keras models """
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from keras.models import load_model
+
+from sample_index import make_sample_index, lookup_samples, get_sample_rows
+from save_results import make_predictions_dataframe
+
+#hash of a saved model, computed on the file content (all the files
+#for models saved as folders), so that the same model always gets
+#the same key in the prediction cache
+def model_hash(model_path):
+	h = hashlib.sha1()
+	if os.path.isdir(model_path):
+		filenames = []
+		for root, dirs, files in os.walk(model_path):
+			filenames += [os.path.join(root, x) for x in files]
+		filenames = sorted(filenames)
+	else:
+		filenames = [model_path]
+
+	for filename in filenames:
+		with open(filename, 'rb') as f:
+			for block in iter(lambda: f.read(1 << 20), b''):
+				h.update(block)
+	return(h.hexdigest())
+
+#loads the saved models, once. For each model a dictionary is returned
+#with keys: path, hash, model, config. The config is read from a json
+#file with the same name of the model (if present), otherwise is empty
+#custom_objects : passed to keras load_model (e.g. custom metrics)
+def load_models(model_paths, custom_objects = None):
+	models = []
+	for model_path in model_paths:
+		print('loading model', model_path)
+		config = {}
+		config_file = os.path.splitext(model_path.rstrip('/'))[0] + '.json'
+		if os.path.exists(config_file):
+			with open(config_file) as f:
+				config = json.load(f)
+		models.append({
+			'path'   : model_path,
+			'hash'   : model_hash(model_path),
+			'model'  : load_model(model_path, custom_objects = custom_objects, compile = False),
+			'config' : config
+		})
+	return(models)
+
+#fingerprint of the features fed to the models: cube shape and type, sample
+#IDs, feature columns and a strided sample of the cube values (at most about
+#max_values of them, so that the whole cube is not read). Predictions of the
+#same sample on a different cube or different columns get a different key
+def features_fingerprint(kinship, kinship_ids, cols = None, max_values = 1000000):
+	h = hashlib.sha1()
+	h.update(repr((kinship.shape, str(kinship.dtype))).encode('utf-8'))
+	h.update('\n'.join([str(x) for x in kinship_ids]).encode('utf-8'))
+	h.update(('all' if cols is None else ','.join([str(int(x)) for x in cols])).encode('utf-8'))
+	step = max(1, int(np.ceil(np.sqrt(kinship.size / max_values))))
+	h.update(np.ascontiguousarray(kinship[:, ::step, ::step]).tobytes())
+	return(h.hexdigest()[:16])
+
+#reads the cached predictions of a model on a set of features (a csv with
+#id, y_hat for each cache key, i.e. model hash and features fingerprint)
+#into a dictionary id -> y_hat
+def read_prediction_cache(cache_dir, key):
+	filename = os.path.join(cache_dir, key + '.csv')
+	if not os.path.exists(filename):
+		return({})
+	cache = pd.read_csv(filename, dtype = {'id' : str})
+	return(dict(zip(cache['id'], cache['y_hat'])))
+
+#checks that the channels of the cube are in the order the models were
+#trained on: the order stored in the model config (key 'channels'), if any,
+#otherwise the expected order passed. Cubes stacked in a different order
+#(e.g. glob order vs make_filenames() order) would silently permute the
+#model inputs, so a mismatch raises an error
+def check_channels(models, channels, expected_channels = None):
+	channels = [str(x) for x in channels]
+	for m in models:
+		expected = m['config'].get('channels', expected_channels)
+		if expected is None:
+			continue
+		expected = [str(x) for x in expected]
+		if channels != expected:
+			raise ValueError('channels of the kinship cube {} do not match the channels of model {}: {}'.format(
+				channels, m['path'], expected))
+
+#appends new predictions to the cache of a model
+def append_prediction_cache(cache_dir, key, ids, y_hat):
+	filename = os.path.join(cache_dir, key + '.csv')
+	new = pd.DataFrame({'id' : ids, 'y_hat' : y_hat})
+	new.to_csv(filename, mode = 'a', header = not os.path.exists(filename), index = False)
+
+#scores the candidates with all the models in a single pass over the kinship:
+#each batch of kinship rows is read once and fed to all the models
+#models         : as returned by load_models()
+#kinship        : kinship cube (channels, samples, samples), possibly memory-mapped
+#kinship_ids    : sample IDs of the cube
+#candidate_ids  : IDs of the samples to be scored
+#channels       : channel names of the cube (as returned by load_kinship_cube()),
+#                 checked against the models with check_channels()
+#expected_channels : channel order for the models without channels in their config
+#cols           : kinship columns used as features (positions), default all
+#batch_size     : number of candidates per batch
+#n_threads      : number of models run in parallel on each batch
+#cache_dir      : if not None, predictions are cached there, keyed by (model
+#                 hash, features fingerprint, sample ID), and only missing
+#                 ones are computed
+#returns a dataframe in the same format of get_predictions(), with a
+#model_hash column and y set to NaN (phenotypes are unknown)
+def score_candidates(models, kinship, kinship_ids, candidate_ids, channels,
+		expected_channels = None, cols = None, batch_size = 256, n_threads = 1,
+		cache_dir = None):
+
+	check_channels(models, channels, expected_channels)
+	candidate_ids = [str(x) for x in candidate_ids]
+	index = make_sample_index(kinship_ids)
+	positions = lookup_samples(index, candidate_ids)
+
+	#retrieving cached predictions
+	if cache_dir is not None:
+		os.makedirs(cache_dir, exist_ok = True)
+	fingerprint = features_fingerprint(kinship, kinship_ids, cols)
+	cache_keys = [m['hash'] + '_' + fingerprint for m in models]
+	caches = []
+	for key in cache_keys:
+		caches.append({} if cache_dir is None else read_prediction_cache(cache_dir, key))
+
+	#running a model on the candidates of a batch that are not cached yet
+	def run_model(i, batch_ids, x):
+		m = models[i]
+		todo = [j for j in range(len(batch_ids)) if batch_ids[j] not in caches[i]]
+		if len(todo) == 0:
+			return
+		x_now = x[todo].reshape((len(todo),) + tuple(m['model'].input_shape[1:]))
+		y_hat = np.asarray(m['model'].predict_on_batch(x_now)).reshape(-1)
+		new_ids = [batch_ids[j] for j in todo]
+		caches[i].update(zip(new_ids, y_hat))
+		if cache_dir is not None:
+			append_prediction_cache(cache_dir, cache_keys[i], new_ids, y_hat)
+
+	with ThreadPoolExecutor(max_workers = n_threads) as pool:
+		for start in range(0, len(candidate_ids), batch_size):
+			batch_ids = candidate_ids[start:(start + batch_size)]
+
+			#do we need to read this batch at all?
+			if all(x in cache for cache in caches for x in batch_ids):
+				continue
+
+			x = get_sample_rows(kinship, positions[start:(start + batch_size)], cols)
+			list(pool.map(lambda i: run_model(i, batch_ids, x), range(len(models))))
+			print('scored', min(start + batch_size, len(candidate_ids)), 'candidates out of', len(candidate_ids))
+
+	#putting together the predictions of all models
+	res = []
+	for i in range(len(models)):
+		y_hat = [caches[i][x] for x in candidate_ids]
+		preds = make_predictions_dataframe(candidate_ids, np.nan, y_hat, models[i]['config'])
+		preds['model_hash'] = models[i]['hash']
+		res.append(preds)
+	return(pd.concat(res, ignore_index = True))
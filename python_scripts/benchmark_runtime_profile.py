@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:20:00 2026
+"""
+
+"""
+Python script that benchmarks the runtime profiles of set_runtime_profile()
+(keras_toolbox.py) on a network from instantiate_network(), trained on random
+kinship-like data: mean epoch time and final val_pearson are reported
+
+With --profile compare each profile is run in a separate process (thread pools
+and oneDNN can only be set before TensorFlow starts) and a summary is printed
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+
+# Create the parser
+parser = argparse.ArgumentParser(description='Benchmark CPU runtime profiles')
+
+# Add arguments
+parser.add_argument('--profile', type=str, required=False, default='compare',
+                    help='default, cpu_bf16 or compare (runs both)')
+parser.add_argument('--intra', type=int, required=False, default=None,
+                    help='intra op threads (default: TensorFlow default)')
+parser.add_argument('--inter', type=int, required=False, default=None,
+                    help='inter op threads (default: TensorFlow default)')
+parser.add_argument('--samples', type=int, required=False, default=1000,
+                    help='number of samples of the random dataset')
+parser.add_argument('--channels', type=int, required=False, default=15,
+                    help='number of kinship channels of the random dataset')
+parser.add_argument('--epochs', type=int, required=False, default=5,
+                    help='number of training epochs')
+# Parse the argument
+args = parser.parse_args()
+
+if args.profile == 'compare':
+    results = []
+    for profile in ['default', 'cpu_bf16']:
+        cmd = [sys.executable, __file__, '--profile', profile,
+               '--samples', str(args.samples), '--channels', str(args.channels),
+               '--epochs', str(args.epochs)]
+        if args.intra is not None:
+            cmd += ['--intra', str(args.intra)]
+        if args.inter is not None:
+            cmd += ['--inter', str(args.inter)]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print("{:<10} {:<16} {:>16} {:>12}".format('profile', 'policy', 'epoch time (s)', 'val_pearson'))
+    for r in results:
+        print("{:<10} {:<16} {:>16.3f} {:>12.4f}".format(r['profile'], r['policy'], r['epoch_time'], r['val_pearson']))
+    sys.exit(0)
+
+## oneDNN must be enabled before TensorFlow is imported
+if args.profile == 'cpu_bf16':
+    os.environ['TF_ENABLE_ONEDNN_OPTS'] = '1'
+
+import numpy as np
+from keras.optimizers import Adam
+from keras_toolbox import instantiate_network, set_runtime_profile
+from keras_metrics import pearson, rmse
+from data_augmentation_toolbox import train_val_split
+
+policy = set_runtime_profile(args.profile, args.intra, args.inter)
+
+## random kinship-like data: each sample is a row of a (samples x samples) kinship
+## per channel, the phenotype is a linear function of the first channel plus noise
+rng = np.random.default_rng(0)
+x = rng.standard_normal((args.samples, args.samples, args.channels, 1)).astype(np.float32)
+y = x[:, :, 0, 0] @ rng.standard_normal(args.samples).astype(np.float32) / np.sqrt(args.samples)
+y = y + 0.5 * rng.standard_normal(args.samples).astype(np.float32)
+
+config = {'input_shape': x.shape[1:], 'val_split': 0.2}
+train_x, train_y, val_x, val_y, sel_val = train_val_split(x, y, config['val_split'])
+
+model = instantiate_network(config)
+model.compile(optimizer=Adam(learning_rate=0.001), loss='mse', metrics=[pearson, rmse])
+
+## one epoch at a time, the first one (tracing) is not timed
+times = []
+for epoch in range(args.epochs):
+    start = time.time()
+    model.fit(train_x, train_y, epochs=1, batch_size=32, verbose=0)
+    times.append(time.time() - start)
+
+val_y_hat = model.predict(val_x, verbose=0).reshape(-1).astype(np.float64)
+val_pearson = np.corrcoef(val_y, val_y_hat)[0, 1]
+
+print(json.dumps({'profile': args.profile, 'policy': policy,
+                  'epoch_time': float(np.mean(times[1:] if len(times) > 1 else times)),
+                  'val_pearson': float(val_pearson)}))
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:10:00 2026
+"""
+
+""" Function(s) to compute bootstrap confidence intervals of prediction metrics """
+
+#%% libraries
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from numpy_metrics import pearson_bulk, rmse_bulk, mae_bulk, ndcg_bulk
+
+#%% resamples are drawn in blocks of this size, each one with its own seed
+BOOTSTRAP_BLOCK = 50
+
+#%% metrics for one chunk of resamples: the resample indices of the chunk are
+#%% drawn as a single integer matrix (n_resamples, n), block by block
+#%% (sizes and seeds of the blocks)
+#%% rmse has the same definition as keras_metrics.rmse (a mean absolute error),
+#%% to match the rmse / val_rmse of the results; true_rmse is the actual rmse
+def _bootstrap_chunk(y, y_hat, sizes, seeds, ks):
+
+    idx = np.concatenate([np.random.default_rng(ss).integers(0, len(y), size=(s, len(y)))
+                          for s, ss in zip(sizes, seeds)])
+
+    res = {'pearson': pearson_bulk(y, y_hat, idx), 'rmse': mae_bulk(y, y_hat, idx),
+           'true_rmse': rmse_bulk(y, y_hat, idx)}
+    for k in ks:
+        res['ndcg_{}'.format(int(round(k * 100)))] = ndcg_bulk(y, y_hat, idx, k)
+
+    return res
+
+#%% arguments of _bootstrap_chunk() for each chunk of resamples (see bootstrap_metrics())
+def _bootstrap_jobs(y, y_hat, n_boot, ks, chunk_size, seed):
+
+    y = np.asarray(y, dtype=np.float64)
+    y_hat = np.asarray(y_hat, dtype=np.float64)
+
+    ## one independent seed per block
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    sizes = [min(BOOTSTRAP_BLOCK, n_boot - x) for x in range(0, n_boot, BOOTSTRAP_BLOCK)]
+    seeds = seed.spawn(len(sizes))
+
+    ## whole blocks in each chunk
+    per_chunk = max(1, int(np.ceil(chunk_size / BOOTSTRAP_BLOCK)))
+    chunk_sizes = [sizes[x:(x + per_chunk)] for x in range(0, len(sizes), per_chunk)]
+    chunk_seeds = [seeds[x:(x + per_chunk)] for x in range(0, len(seeds), per_chunk)]
+
+    return [(y, y_hat, s, ss, ks) for s, ss in zip(chunk_sizes, chunk_seeds)]
+
+#%% run the jobs of _bootstrap_jobs(), in the pool if any, and put the chunks back together
+def _run_jobs(jobs, pool = None):
+
+    if pool is None:
+        return [_bootstrap_chunk(*x) for x in jobs]
+
+    futures = [pool.submit(_bootstrap_chunk, *x) for x in jobs]
+    return [x.result() for x in futures]
+
+def _concat_chunks(chunks):
+
+    return {m: np.concatenate([x[m] for x in chunks]) for m in chunks[0].keys()}
+
+#%% bootstrap distribution of pearson, rmse, true_rmse and ndcg (one per k) of
+#%% y_hat vs y (see _bootstrap_chunk() for the two rmse)
+#%% resamples are computed in chunks of chunk_size (rounded up to a multiple
+#%% of BOOTSTRAP_BLOCK), to bound memory to chunk_size * len(y) values,
+#%% optionally across n_jobs processes
+#%% seeds are spawned per block of BOOTSTRAP_BLOCK resamples, so results do
+#%% not depend on chunk_size or n_jobs for a given seed
+#%% seed: an int, None or a np.random.SeedSequence
+#%% returns a dictionary metric -> array of n_boot values
+def bootstrap_metrics(y, y_hat, n_boot = 1000, ks = (0.25, 0.5, 1.0), chunk_size = 100, seed = None, n_jobs = 1):
+
+    jobs = _bootstrap_jobs(y, y_hat, n_boot, ks, chunk_size, seed)
+
+    if n_jobs == 1:
+        return _concat_chunks(_run_jobs(jobs))
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return _concat_chunks(_run_jobs(jobs, pool))
+
+#%% columns identifying a run in both predictions and results tables
+RUN_COLUMNS = ['config_hash', 'replicate']
+
+#%% bootstrap confidence intervals from a predictions dataframe (see get_predictions()),
+#%% one row per group of group_cols (by default one run: config_hash and replicate)
+#%% for each metric, columns prefix + metric + '_ci_low' / '_ci_high' are returned
+#%% with the (alpha/2, 1 - alpha/2) percentiles of the bootstrap distribution
+#%% each group gets its own child seed, so that groups are resampled independently
+#%% with n_jobs > 1 the chunks of all the groups are submitted to a single pool
+def bootstrap_ci(preds, group_cols = RUN_COLUMNS, alpha = 0.05, n_boot = 1000, ks = (0.25, 0.5, 1.0),
+                 chunk_size = 100, seed = None, n_jobs = 1, prefix = 'val_'):
+
+    groups = preds.groupby(group_cols, sort=False, dropna=False)
+    seeds = np.random.SeedSequence(seed).spawn(groups.ngroups)
+
+    keys = []
+    jobs = []
+    for (key, grp), group_seed in zip(groups, seeds):
+        keys.append(key if isinstance(key, tuple) else (key,))
+        jobs.append(_bootstrap_jobs(grp['y'].to_numpy(), grp['y_hat'].to_numpy(), n_boot, ks, chunk_size, group_seed))
+
+    if n_jobs == 1:
+        chunks = [_run_jobs(x) for x in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            flat = _run_jobs([x for group_jobs in jobs for x in group_jobs], pool)
+        bounds = np.cumsum([0] + [len(x) for x in jobs])
+        chunks = [flat[bounds[i]:bounds[i + 1]] for i in range(len(jobs))]
+
+    records = []
+    for key, group_chunks in zip(keys, chunks):
+        rec = dict(zip(group_cols, key))
+        for m, values in _concat_chunks(group_chunks).items():
+            low, high = np.nanpercentile(values, [100 * alpha / 2, 100 * (1 - alpha / 2)])
+            rec[prefix + m + '_ci_low'] = low
+            rec[prefix + m + '_ci_high'] = high
+        records.append(rec)
+
+    return pd.DataFrame(records)
+
+#%% attach the confidence intervals to a results table (from parse_results()),
+#%% by default on the run columns (canonical config hash and replicate), which
+#%% are compared as strings (replicate is categorical in the results)
+def attach_ci(res, ci, on = RUN_COLUMNS):
+
+    res = res.copy()
+    ci = ci.copy()
+    for col in on:
+        res[col] = res[col].astype(str)
+        ci[col] = ci[col].astype(str)
+
+    return res.merge(ci, on=on, how='left')
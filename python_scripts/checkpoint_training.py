@@ -0,0 +1,108 @@
+"""
+Created on Mon Oct 19 15:45:00 2026
+"""
+
+""" Training loop with periodic checkpoints, resumable after preemption """
+
+import os
+import json
+import types
+from keras.models import load_model
+from keras.utils import set_random_seed
+
+from data_augmentation_toolbox import train_val_split, split_by_indices, merge_history
+
+#file names inside the checkpoint folder: the model of each checkpoint has
+#its own file (with the epoch number), the state file points to the current one
+CHECKPOINT_MODEL = 'model_epoch{}.keras'
+CHECKPOINT_STATE = 'state.json'
+
+#writes the checkpoint: the model (weights and optimizer state) and a json
+#with the training state. The model is written to a new file, named after the
+#epoch, and then the state (pointing to it) replaces the previous one: this
+#replace is the only commit point, so a job killed at any time while saving
+#leaves the previous checkpoint (model and state) intact. Old models are
+#removed afterwards
+def save_checkpoint(checkpoint_dir, model, state):
+	os.makedirs(checkpoint_dir, exist_ok = True)
+	
+	model_file = CHECKPOINT_MODEL.format(state['epoch'])
+	tmp_model = os.path.join(checkpoint_dir, 'tmp_' + model_file)
+	model.save(tmp_model)
+	os.replace(tmp_model, os.path.join(checkpoint_dir, model_file))
+	
+	state = dict(state, model_file = model_file)
+	tmp_state = os.path.join(checkpoint_dir, 'tmp_' + CHECKPOINT_STATE)
+	with open(tmp_state, 'w') as f:
+		json.dump(state, f)
+	os.replace(tmp_state, os.path.join(checkpoint_dir, CHECKPOINT_STATE))
+	
+	#models of previous checkpoints (or of interrupted saves) are not needed anymore
+	for filename in os.listdir(checkpoint_dir):
+		if filename.endswith('.keras') and filename != model_file:
+			os.remove(os.path.join(checkpoint_dir, filename))
+
+#reads the checkpoint, returns (model, state) or (None, None) if there is none
+#custom_objects : passed to keras load_model (e.g. custom metrics)
+def load_checkpoint(checkpoint_dir, custom_objects = None):
+	state_file = os.path.join(checkpoint_dir, CHECKPOINT_STATE)
+	if not os.path.exists(state_file):
+		return(None, None)
+	
+	with open(state_file) as f:
+		state = json.load(f)
+	model = load_model(os.path.join(checkpoint_dir, state['model_file']), custom_objects = custom_objects)
+	return(model, state)
+
+#trains a model one epoch at a time (model.fit() on training set, model.evaluate()
+#on validation set, merged via merge_history()), saving a checkpoint every
+#"checkpoint_every" epochs and at the end. If a checkpoint is found in
+#checkpoint_dir training resumes from there, so that a preempted run loses
+#at most checkpoint_every epochs.
+#Runs are deterministic: the random seed is reset to seed + epoch at the
+#beginning of each epoch, and the validation indices are stored in the checkpoint
+#build_model    : function returning a compiled model (called only when not resuming)
+#x, y           : the whole dataset, split with train_val_split()
+#config_dict    : uses 'num_epochs', 'val_split' and 'batch_size' (default 32)
+#custom_objects : passed to keras load_model (e.g. custom metrics)
+#returns the model, the merged history (feedable to parse_history()) and
+#the validation indices
+def train_with_checkpoints(build_model, x, y, config_dict, checkpoint_dir, checkpoint_every = 10,
+		seed = 0, custom_objects = None, verbose = 0):
+	
+	num_epochs = config_dict['num_epochs']
+	batch_size = config_dict.get('batch_size', 32)
+	
+	model, state = load_checkpoint(checkpoint_dir, custom_objects)
+	if state is None:
+		#new run
+		set_random_seed(seed)
+		train_x, train_y, val_x, val_y, sel_val = train_val_split(x, y, config_dict['val_split'])
+		model = build_model()
+		state = {'epoch' : 0, 'seed' : seed, 'sel_val' : sel_val, 'history' : None, 'params' : None}
+	else:
+		#resuming
+		print('resuming from checkpoint at epoch', state['epoch'])
+		seed = state['seed']
+		train_x, train_y, val_x, val_y, sel_val = split_by_indices(x, y, state['sel_val'])
+	
+	h = None
+	if state['history'] is not None:
+		h = types.SimpleNamespace(history = state['history'], params = state['params'])
+	
+	for epoch in range(state['epoch'], num_epochs):
+		set_random_seed(seed + epoch)
+		train_h = model.fit(train_x, train_y, epochs = 1, batch_size = batch_size, verbose = verbose)
+		val_eval = model.evaluate(val_x, val_y, batch_size = batch_size, verbose = 0)
+		h = merge_history(train_h, val_eval, model.metrics_names, h)
+		
+		#the total number of epochs, for parse_history()
+		h.params['epochs'] = num_epochs
+		
+		state['epoch'] = epoch + 1
+		if (state['epoch'] % checkpoint_every == 0) or (state['epoch'] == num_epochs):
+			state['history'] = h.history
+			state['params'] = h.params
+			save_checkpoint(checkpoint_dir, model, state)
+	
+	return(model, h, sel_val)
@@ -11,8 +11,17 @@ def train_val_split(x, y, validation_split):
 	#a list of indexes
 	items = list(range(len(y)))
 	
-	#the selection slices
+	#the validation slice
 	sel_val   = random.sample(items, n)
+	
+	#splitting x and y accordingly
+	return(split_by_indices(x, y, sel_val))
+
+#same as train_val_split, but using the passed validation indices (e.g. 
+#the ones returned by a previous call of train_val_split)
+def split_by_indices(x, y, sel_val):
+	#the training slice is everything else
+	items = list(range(len(y)))
 	sel_train = list(set(items) - set(sel_val))
 	
 	#use it on x and y, directly and reverse
@@ -35,28 +44,202 @@ def train_val_split(x, y, validation_split):
 #The number of
 #times the whole dataset is copied is regulated by "reps".
 #The original dataset is included, untouched	
-def augment_add_normal_noise(x, y, reps=1, mu=0, sigma=0.1, mu_x=None, sigma_x = None):
-	rng = default_rng()
-	result_x = x
-	result_y = y
-	for i in range(reps):
-		#adding the required noise
-		x_now = x.copy()
-		y_now = y.copy()
+#The result is allocated once and the noise is written in place, so no
+#other copy of the data is made. Pass a seed for reproducible noise
+def augment_add_normal_noise(x, y, reps=1, mu=0, sigma=0.1, mu_x=None, sigma_x = None, seed = None):
+	rng = default_rng(seed)
+	n = len(y)
+	result_x = _allocate_reps(x, reps, noisy = mu_x is not None)
+	result_y = _allocate_reps(y, reps, noisy = mu is not None)
+	for i in range(1, reps + 1):
+		x_now = result_x[(i * n):((i + 1) * n)]
+		y_now = result_y[(i * n):((i + 1) * n)]
 		
 		#should we add noise to y?
 		if mu is not None:
-			y_now = y + mu + sigma * rng.standard_normal(size = len(y))
+			_add_normal_noise(y_now, y, mu, sigma, rng)
 				
 		#should we add noise to x?
 		if mu_x is not None:
-			x_now = x + mu_x + sigma_x * rng.standard_normal(size = x.shape)
-		
-		#putting all together
-		result_x = np.concatenate((result_x, x_now))
-		result_y = np.concatenate((result_y, y_now))
+			_add_normal_noise(x_now, x, mu_x, sigma_x, rng)
 	return(result_x, result_y)
 
+#allocates the array for the original data plus reps copies, and fills
+#it with the data. If noise is going to be added, the array is float (the
+#data type is kept if already float, e.g. float32 kinships)
+def _allocate_reps(data, reps, noisy):
+	data = np.asarray(data)
+	dtype = data.dtype
+	if noisy and not np.issubdtype(dtype, np.floating):
+		dtype = np.float64
+	res = np.empty((len(data) * (reps + 1),) + data.shape[1:], dtype = dtype)
+	for i in range(reps + 1):
+		res[(i * len(data)):((i + 1) * len(data))] = data
+	return(res)
+
+#target = data + mu + sigma * N(0, 1), written in place on target (the noise
+#is generated directly in target, no temporary arrays)
+def _add_normal_noise(target, data, mu, sigma, rng):
+	if target.dtype in (np.float32, np.float64):
+		rng.standard_normal(out = target, dtype = target.dtype)
+	else:
+		target[...] = rng.standard_normal(size = target.shape)
+	target *= sigma
+	target += mu
+	target += data
+
+#adds symmetric normal noise to a kinship cube (channels, samples, samples),
+#in place, so that each channel stays symmetric (K = K.T). The same noise
+#E[i, j] = E[j, i] ~ N(0, sigma^2) is added to both halves of the matrix.
+#sigma can be a single value or one value per channel.
+#Noise is generated for block_rows rows at a time, to bound memory.
+#Since the cube is modified in place it must be writable (e.g. 
+#load_kinship_cube(mmap_mode = 'r+') or a copy), and the original is lost:
+#this is meant for a one-off perturbation. To train on several symmetric
+#noisy copies without copying the cube use symmetric_noise_transform()
+def augment_symmetric_noise(k, sigma = 0.1, block_rows = 1024, seed = None):
+	rng = default_rng(seed)
+	n = k.shape[1]
+	sigmas = np.broadcast_to(np.asarray(sigma, dtype = np.float64), (k.shape[0],))
+	for c in range(k.shape[0]):
+		for r0 in range(0, n, block_rows):
+			r1 = min(r0 + block_rows, n)
+			e = sigmas[c] * rng.standard_normal(size = (r1 - r0, n))
+			
+			#only the upper triangle (j >= i) of the block is used
+			rows = np.arange(r0, r1)
+			e[np.arange(n)[None, :] < rows[:, None]] = 0
+			diag = e[rows - r0, rows].copy()
+			
+			#the diagonal is added twice, removing it once
+			k[c, r0:r1, :] += e
+			k[c, :, r0:r1] += e.T
+			k[c, rows, rows] -= diag
+	return(k)
+
+#the following functions are batch transforms for augmentation_batches():
+#each one returns a function f(x, y, rng, sel, rep) -> (x, y) working on a
+#batch (a copy of the data, so that it can be modified in place); sel are
+#the positions in x of the batch examples and rep the augmented copy number
+
+#mixup: each example is replaced by a convex combination with another example of
+#the batch, with weights lambda ~ Beta(alpha, alpha), on both x and y
+def mixup_transform(alpha = 0.2):
+	def transform(x, y, rng, sel, rep):
+		lam = rng.beta(alpha, alpha, size = len(y))
+		perm = rng.permutation(len(y))
+		lam_x = lam.reshape((-1,) + (1,) * (x.ndim - 1)).astype(x.dtype)
+		x_new = lam_x * x + (1 - lam_x) * x[perm]
+		y_new = lam * y + (1 - lam) * y[perm]
+		return(x_new, y_new)
+	return(transform)
+
+#normal noise on x, with one sigma per channel (channel_axis, by default 2
+#as in get_sample_rows() and symmetric_noise_transform(), also for inputs
+#reshaped to (samples, cols, channels, 1)). A single sigma is used for all channels
+def channel_noise_transform(sigmas, channel_axis = 2):
+	def transform(x, y, rng, sel, rep):
+		n_channels = x.shape[channel_axis]
+		shape = [1] * x.ndim
+		shape[channel_axis] = n_channels
+		s = np.broadcast_to(np.asarray(sigmas, dtype = x.dtype), (n_channels,)).reshape(shape)
+		x += s * rng.standard_normal(size = x.shape, dtype = x.dtype)
+		return(x, y)
+	return(transform)
+
+#normal noise on x and/or y, as in augment_add_normal_noise()
+def normal_noise_transform(mu = 0, sigma = 0.1, mu_x = None, sigma_x = None):
+	def transform(x, y, rng, sel, rep):
+		if mu is not None:
+			y = y + mu + sigma * rng.standard_normal(size = len(y))
+		if mu_x is not None:
+			x += mu_x + sigma_x * rng.standard_normal(size = x.shape, dtype = x.dtype)
+		return(x, y)
+	return(transform)
+
+#symmetric normal noise, computed on the fly: the batch examples are kinship
+#rows (as from get_sample_rows(), samples x columns x channels) and each rep is
+#as if the noise E, with E[i, j] = E[j, i] ~ N(0, sigma^2), had been added to the
+#whole cube (as in augment_symmetric_noise()), but only the noise for the rows
+#of the batch is generated. E[i, j] is a deterministic function of (seed, rep,
+#channel, i, j), so rows i and j see the same value in any batch or epoch.
+#rows : cube positions of the examples of x (default: x is the whole cube, in order)
+#cols : cube positions of the feature columns of x (default: all, in order)
+#sigma can be a single value or one value per channel.
+#Use it before any transform mixing examples (e.g. mixup)
+def symmetric_noise_transform(sigma = 0.1, rows = None, cols = None, seed = 0, channel_axis = 2):
+	def transform(x, y, rng, sel, rep):
+		r = np.asarray(sel) if rows is None else np.asarray(rows)[sel]
+		c = np.arange(x.shape[1]) if cols is None else np.asarray(cols)
+		sigmas = np.broadcast_to(np.asarray(sigma, dtype = np.float64), (x.shape[channel_axis],))
+		for ch in range(x.shape[channel_axis]):
+			e = sigmas[ch] * _pair_normal(r, c, (seed, rep, ch))
+			idx = [slice(None)] * x.ndim
+			idx[channel_axis] = ch
+			x_ch = x[tuple(idx)]
+			x_ch += e.reshape(e.shape + (1,) * (x_ch.ndim - 2)).astype(x.dtype)
+		return(x, y)
+	return(transform)
+
+#splitmix64 mixing function, on uint64 arrays (overflow wraps around)
+def _mix64(z):
+	z = z ^ (z >> np.uint64(30))
+	z = z * np.uint64(0xBF58476D1CE4E5B9)
+	z = z ^ (z >> np.uint64(27))
+	z = z * np.uint64(0x94D049BB133111EB)
+	return(z ^ (z >> np.uint64(31)))
+
+#standard normal values for each pair (rows[a], cols[b]), symmetric in the
+#pair (same value for (i, j) and (j, i)) and fully determined by key (a tuple
+#of non negative ints), so they can be recomputed for any subset of pairs
+def _pair_normal(rows, cols, key):
+	with np.errstate(over = 'ignore'):
+		k = np.uint64(0)
+		for v in key:
+			k = _mix64(k + np.uint64(v) + np.uint64(0x9E3779B97F4A7C15))
+		i = np.asarray(rows, dtype = np.uint64)[:, None]
+		j = np.asarray(cols, dtype = np.uint64)[None, :]
+		z = _mix64(k + np.minimum(i, j) * np.uint64(0x9E3779B97F4A7C15))
+		z = _mix64(z + np.maximum(i, j))
+	
+	#two uniforms in (0, 1) from the two halves of z, then Box-Muller
+	u1 = ((z >> np.uint64(32)).astype(np.float64) + 0.5) / 2.0 ** 32
+	u2 = ((z & np.uint64(0xFFFFFFFF)).astype(np.float64) + 0.5) / 2.0 ** 32
+	return(np.sqrt(-2 * np.log(u1)) * np.cos(2 * np.pi * u2))
+
+#generator of augmented batches, computed on the fly, so that memory does not
+#grow with the number of reps. Each epoch goes through the original data
+#(untouched) and then "reps" augmented copies, in shuffled batches.
+#transforms : list of batch transforms (see above), applied in order
+#x must be a float array with the examples along the first axis: for a kinship
+#cube from load_kinship_cube(), of shape (channels, samples, samples), pass the
+#view np.moveaxis(k, 0, -1), i.e. (samples, samples, channels) as returned by
+#get_sample_rows() (the cube is not copied, only the rows of each batch are read).
+#Can be passed to model.fit() (with steps_per_epoch =
+#augmentation_steps(len(y), batch_size, reps))
+def augmentation_batches(x, y, batch_size, transforms, reps = 1, seed = None, shuffle = True, epochs = None):
+	rng = default_rng(seed)
+	y = np.asarray(y)
+	epoch = 0
+	while epochs is None or epoch < epochs:
+		for rep in range(reps + 1):
+			order = rng.permutation(len(y)) if shuffle else np.arange(len(y))
+			for start in range(0, len(y), batch_size):
+				sel = np.sort(order[start:(start + batch_size)])
+				x_batch = x[sel]
+				y_batch = y[sel]
+				if rep > 0:
+					#x_batch and y_batch are already copies (fancy indexing)
+					y_batch = y_batch.astype(np.float64)
+					for transform in transforms:
+						x_batch, y_batch = transform(x_batch, y_batch, rng, sel, rep)
+				yield(x_batch, y_batch)
+		epoch += 1
+
+#number of batches per epoch produced by augmentation_batches()
+def augmentation_steps(n, batch_size, reps = 1):
+	return(int(np.ceil(n / batch_size)) * (reps + 1))
+
 #creates or updates a class object that mimicks what is returned by
 #keras model.fit() method, so that it's feedable to parse_history()
 #train_set_history   : returned by model.fit() on train data
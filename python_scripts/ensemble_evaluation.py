@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:35:00 2026
+"""
+
+""" Function(s) to evaluate model-averaging ensembles across replicates """
+
+#%% libraries
+import os
+import numpy as np
+import pandas as pd
+
+from numpy_metrics import pearson, rmse, ndcg
+
+## columns of the predictions files that are not config options
+## (see make_predictions_dataframe())
+PREDICTION_COLUMNS = ['timestamp', 'id', 'y', 'y_hat', 'config_hash', 'replicate']
+
+#%% metrics of the current ensemble of a config: each sample is scored on y_hat
+#%% averaged over the models of the ensemble that predicted it (replicates have
+#%% their own validation sets, so not all models predict all samples)
+#%% coverage is reported as the number of samples predicted by all the models
+#%% (n_samples_full) and the mean number of models per sample
+#%% intersection: only the samples predicted by all the models are scored; this
+#%% requires a validation split shared by all replicates
+#%% true_rmse is the actual root mean squared error (numpy_metrics.rmse), not
+#%% the rmse of keras_metrics (val_rmse in the results), which is a mean absolute error
+def _ensemble_metrics(acc, size, ks, intersection = False):
+
+    full = acc['n'] == size
+    if intersection:
+        if not full.all():
+            raise ValueError("ensembles on the intersection of the samples require a validation split shared by all replicates")
+        acc = acc[full]
+    y = acc['y'].to_numpy()
+    y_hat = (acc['y_hat_sum'] / acc['n']).to_numpy()
+
+    res = {'n_samples': len(y), 'n_samples_any': len(full), 'n_samples_full': int(full.sum()),
+           'mean_models_per_sample': acc['n'].mean()}
+    metrics = {'pearson': pearson, 'true_rmse': rmse}
+    for k in ks:
+        metrics['ndcg_{}'.format(int(round(k * 100)))] = lambda a, b, k=k: ndcg(a, b, k)
+    for naam, f in metrics.items():
+        res[naam] = f(y, y_hat) if len(y) > 1 else np.nan
+
+    return res
+
+#%% function to evaluate ensembles from a predictions file (as written by get_predictions())
+#%% predictions are streamed in chunks and grouped by config and replicate (the
+#%% timestamp for files without a replicate column, or rows without a replicate),
+#%% and replicates are added to the ensemble in file order; a sample predicted
+#%% more than once in a replicate is counted once, on its mean prediction
+#%% only the running sum of y_hat per (config, sample ID) is kept in memory, so
+#%% memory does not depend on the number of replicates
+#%% returns a dataframe with pearson, true_rmse and ndcg for each config and
+#%% ensemble size (see _ensemble_metrics() for the samples used and intersection);
+#%% configs are identified by config_key, a hash of the config columns as written
+#%% in the predictions (str(v) of each value, so not the same as save_results.config_hash())
+#%% optionally if an outfilepath is passed the dataframe is saved as csv
+def evaluate_ensembles(filepath, chunksize = 100000, ks = (0.25, 0.5, 1.0), outfilepath = None,
+                       intersection = False):
+
+    basename = os.path.basename(filepath)
+    basefolder = os.path.dirname(filepath)
+    print("Reading predictions '{}' from folder '{}'".format(basename, basefolder))
+
+    ## state of each config: current replicate (key and its rows),
+    ## running ensemble and config values
+    state = dict()
+    records = []
+
+    def close_replicate(cfg):
+        st = state[cfg]
+        rep = pd.concat(st['part']).groupby('id', sort=False).agg({'y': 'first', 'y_hat': 'mean'})
+        rep = pd.DataFrame({'y': rep['y'].to_numpy(), 'y_hat_sum': rep['y_hat'].to_numpy(), 'n': 1},
+                           index=rep.index.to_numpy())
+        if st['acc'] is None:
+            st['acc'] = rep
+        else:
+            st['acc'] = pd.concat([st['acc'], rep]).groupby(level=0).agg(
+                {'y': 'first', 'y_hat_sum': 'sum', 'n': 'sum'})
+        st['size'] += 1
+        st['part'] = []
+
+        rec = {'config_key': cfg, 'ensemble_size': st['size']}
+        rec.update(_ensemble_metrics(st['acc'], st['size'], ks, intersection))
+        rec.update(st['config'])
+        records.append(rec)
+
+    ## everything is read as string (config values are written as str(v)), except
+    ## y and y_hat: inferring types chunk by chunk would change the config strings
+    ## (e.g. 1 vs 1.0 when a chunk has missing values)
+    header = pd.read_csv(filepath, nrows=0).columns
+    dtypes = {x: str for x in header}
+    dtypes.update({'y': np.float64, 'y_hat': np.float64})
+
+    for chunk in pd.read_csv(filepath, chunksize=chunksize, dtype=dtypes, keep_default_na=False, na_values={'y': [''], 'y_hat': ['']}):
+        chunk = chunk.drop([x for x in chunk.columns if x.startswith('Unnamed')], axis=1)
+        config_cols = [x for x in chunk.columns if x not in PREDICTION_COLUMNS]
+
+        ## vectorized hash of the config columns of each row
+        chunk['config_key'] = pd.util.hash_pandas_object(chunk[config_cols], index=False).to_numpy()
+
+        ## replicate of each row, falling back to the timestamp
+        run_key = 'timestamp_' + chunk['timestamp']
+        if 'replicate' in chunk.columns:
+            run_key = run_key.where(chunk['replicate'] == '', 'replicate_' + chunk['replicate'])
+        chunk['run_key'] = run_key
+
+        for (cfg, run), grp in chunk.groupby(['config_key', 'run_key'], sort=False):
+            if cfg not in state:
+                state[cfg] = {'run': run, 'part': [], 'acc': None, 'size': 0,
+                              'config': grp.iloc[0][config_cols].to_dict()}
+            elif state[cfg]['run'] != run:
+                close_replicate(cfg)
+                state[cfg]['run'] = run
+            state[cfg]['part'].append(grp[['id', 'y', 'y_hat']])
+
+    ## last replicate of each config
+    for cfg in state.keys():
+        if len(state[cfg]['part']) > 0:
+            close_replicate(cfg)
+
+    res = pd.DataFrame(records)
+    print(" - {} configs evaluated".format(len(state)))
+
+    #should we save a csv?
+    if outfilepath is not None:
+        res.to_csv(outfilepath)
+
+    return res
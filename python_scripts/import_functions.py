@@ -14,6 +14,8 @@ importing relevant libraries
 import os
 import glob
 import gzip
+import json
+import re
 import shutil
 import urllib
 import requests
@@ -27,12 +29,17 @@ import pandas as pd
 FUNCTIONS
 """
 
+## kinship types and MAF grid of the kinship files
+KINSHIP_TYPES = ['additive','dominance','epistasis_AA','epistasis_AD','epistasis_DD']
+MIN_MAF = ['0.01','0.05']
+MAX_MAF = ['0.05', '0.5']
+
 ## function to create list of file names
 def make_filenames():
     
-    ktype = ['additive','dominance','epistasis_AA','epistasis_AD','epistasis_DD']
-    minMAF = ['0.01','0.05']
-    maxMAF = ['0.05', '0.5']
+    ktype = KINSHIP_TYPES
+    minMAF = MIN_MAF
+    maxMAF = MAX_MAF
 
     temp = ["kinship_"+x for x in ktype]
     tmp = []
@@ -108,25 +115,82 @@ def download_files2(target_dir,remote_data_folder):
         os.remove(outfname)
 
 ## function to stack kinships into a 3D array
-def stack_kinship(base_dir):
+## if return_ids is True the sample IDs (row labels of the kinship files)
+## and the channel names (file names without extension, in stacking order)
+## are returned too, so that samples can be aligned with phenotypes and
+## channels checked against make_filenames()
+def stack_kinship(base_dir, return_ids=False):
     
     filenames = glob.glob(base_dir + '*')
     filenames = [os.path.basename(x) for x in filenames]
     
     array_list = []
+    ids = None
     for filex in filenames:
         print("reading", filex)
         path_to_file = base_dir + filex
-        temp = pd.read_csv(path_to_file, index_col=0).to_numpy()
-        array_list.append(temp)
+        temp = pd.read_csv(path_to_file, index_col=0)
+        if ids is None:
+            ids = temp.index.astype(str).to_numpy()
+        elif not np.array_equal(ids, temp.index.astype(str).to_numpy()):
+            raise ValueError("samples in file '{}' are not in the same order as in the other kinships".format(filex))
+        array_list.append(temp.to_numpy())
     
     k = np.array(array_list)
     print("The shape of the resulting 3-D array is:")
     print(k.shape)
     
+    if return_ids == True:
+        channels = [re.sub(r"\.csv(\.gz)?$", "", x) for x in filenames]
+        return k, ids, channels
+    
     return k
 
 
+## save a 3D kinship array (channels, samples, samples) as a binary .npy cube
+## sample IDs and channel names (e.g. from stack_kinship(return_ids=True))
+## are stored in a json file next to it (same name, .json extension)
+def save_kinship_cube(k, ids, channels, filename):
+    
+    if k.shape[1] != len(ids) or k.shape[2] != len(ids):
+        raise ValueError("kinship of shape {} does not match {} sample IDs".format(k.shape, len(ids)))
+    if k.shape[0] != len(channels):
+        raise ValueError("kinship of shape {} does not match {} channel names".format(k.shape, len(channels)))
+    
+    basedir = os.path.dirname(filename)
+    if basedir != '':
+        os.makedirs(basedir, exist_ok=True)
+    
+    np.save(filename, k)
+    write_cube_metadata(filename, ids, channels)
+    
+    print("kinship cube of shape {} written to {}".format(k.shape, filename))
+
+
+## write the json file with sample IDs and channel names of a kinship cube
+def write_cube_metadata(filename, ids, channels):
+    
+    meta = {'ids': [str(x) for x in ids],
+            'channels': [str(x) for x in channels]}
+    with open(os.path.splitext(filename)[0] + '.json', 'w') as f:
+        json.dump(meta, f)
+
+
+## load a kinship cube written by save_kinship_cube()
+## by default the array is memory-mapped (read only), so that only the
+## slices that are actually used are read from disk
+## returns the cube, the sample IDs and the channel names
+def load_kinship_cube(filename, mmap_mode='r'):
+    
+    k = np.load(filename, mmap_mode=mmap_mode)
+    with open(os.path.splitext(filename)[0] + '.json') as f:
+        meta = json.load(f)
+    
+    print("kinship cube of shape {} loaded from {}".format(k.shape, filename))
+    
+    return k, np.array(meta['ids']), meta['channels']
+
+
 ## function that downloads the phenotype data files
 ## by default the sorted phenotypes (otherwise unsorted)
 def download_phenotype_files(target_dir,remote_data_folder,fnaam='phenotypes',is_sorted=True):
@@ -154,13 +218,19 @@ def download_phenotype_files(target_dir,remote_data_folder,fnaam='phenotypes',is
 ## load the phenotypic data
 ## read the file and select the trait
 ## convert to either a 1d or 2d array
-def load_phenotypes_and_select_trait(base_dir, trait, fnaam='phenotypes', is_sorted=True, df_output=False):
+## if return_ids is True the sample IDs are returned too (in file order,
+## which does not need to match the kinship order: use
+## sample_index.align_samples() to match the two)
+def load_phenotypes_and_select_trait(base_dir, trait, fnaam='phenotypes', is_sorted=True, df_output=False, return_ids=False):
     
     fname = fnaam + '_sorted.csv' if is_sorted == True else fnaam + '.csv'
     print("select trait {} from phenotype file {}".format(trait,base_dir+fname))
     
     path_to_file = base_dir + fname
-    temp = pd.read_csv(path_to_file, index_col=0)
+    ## only the sample column (first one) and the selected trait are read
+    header = pd.read_csv(path_to_file, nrows=0).columns
+    temp = pd.read_csv(path_to_file, index_col=0, usecols=[header[0], trait])
+    ids = temp.index.astype(str).to_numpy()
     
     print("The selected trait is ", trait)
     
@@ -173,6 +243,9 @@ def load_phenotypes_and_select_trait(base_dir, trait, fnaam='phenotypes', is_sor
     ## convert to numpy.array and return (1d array, sorted as the input file and as the kinship matrix)
         phen = temp[trait].to_numpy()
     
+    if return_ids == True:
+        return phen, ids
+    
     return phen
     
     
@@ -9,6 +9,7 @@ Created on Thu Jan 20 17:14:30 2022
 import numpy as np
 import tensorflow as tf
 import keras.backend as KB
+from numpy_metrics import ndcg
 
 #pearson's correlation
 def pearson(x, y):
@@ -30,34 +31,7 @@ def rmse(x, y):
   return KB.mean(KB.sqrt((x - y) ** 2))
 
 ## NDCG: normalised discounted cumulative gain
-## 1) basic version to work with arrays (numpy))
-def ndcg(y, y_hat, k):
-    
-    n = len(y)
-    ## select the k top examples
-    nk = np.round(k*n).astype(int)
-
-    ## decreasing order: use slicing
-    ## arr[start:end:step]
-    y_inds = np.argsort(y)[::-1] ##revert argsort to get decreasing order
-    y_sort_y = y[y_inds]
-    y_hat_inds = np.argsort(y_hat)[::-1]
-    y_sort_y_hat = y[y_hat_inds]
-    
-    seq = np.arange(1.0, nk+1)
-    d = 1/np.log2(seq+1)
-    
-    ## subset arrays
-    sliced_y_hat = y_sort_y_hat[0:nk]
-    sliced_y = y_sort_y[0:nk]
-    
-    num = sum(sliced_y_hat*d)
-    den = sum(sliced_y*d)
-
-    temp = num/den
-    
-    return(temp)
-
+## 1) basic version to work with arrays (numpy), see numpy_metrics.py
 
 ## 2) version for tensors (Keras) [in progress]
 def ndcg_tf(y, y_hat, k):
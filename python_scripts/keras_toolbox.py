@@ -6,7 +6,11 @@ Created on Thu Jan 21 10:14:30 2022
 
 """ A collection of useful functions for keras"""
 
+import os
+import sys
+import tensorflow as tf
 from matplotlib import pyplot
+from keras import mixed_precision
 from keras.models import Sequential
 from keras.layers import Dense, Dropout, Activation, Flatten, Input
 from keras.layers import Conv2D, MaxPooling2D
@@ -88,8 +92,8 @@ def instantiate_network(config_dict):
 		model.add(Dense(nodes, activation='relu', kernel_regularizer=L1L2))
 		model.add(Dropout(drop_rate))
 	
-	#final output
-	model.add(Dense(1, activation='linear', kernel_regularizer=L1L2))
+	#final output, always in float32 (also with mixed precision profiles)
+	model.add(Dense(1, activation='linear', kernel_regularizer=L1L2, dtype='float32'))
 		
 	return(model)
 
@@ -107,3 +111,50 @@ def get_regularizers(regularizer_l1, regularizer_l2):
 	if regularizer_l2 is not None :
 		#L2 only
 		return l2(l2=regularizer_l2)
+
+#runtime profiles for CPU training:
+# - 'default'  : TensorFlow defaults (float32)
+# - 'cpu_bf16' : bfloat16 mixed precision, if the CPU supports it (float32
+#                otherwise); it's meant to run with oneDNN, which can't be
+#                switched on from here (see below)
+#intra_op_threads and inter_op_threads set the TensorFlow thread pools (None
+#keeps the default, i.e. all cores), so that several jobs sharing a machine
+#do not oversubscribe it.
+#Must be called before any model is built: thread pools can't be changed once
+#TensorFlow has started. oneDNN is read from TF_ENABLE_ONEDNN_OPTS when
+#TensorFlow is imported (i.e. before this module is loaded), so it's left to
+#the caller or the environment; a warning is printed if it's turned off
+def set_runtime_profile(profile = 'default', intra_op_threads = None, inter_op_threads = None):
+	if profile not in ['default', 'cpu_bf16']:
+		raise ValueError('unknown runtime profile: ' + profile)
+	
+	if intra_op_threads is not None:
+		tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+	if inter_op_threads is not None:
+		tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+	
+	policy = 'float32'
+	if profile == 'cpu_bf16':
+		if os.environ.get('TF_ENABLE_ONEDNN_OPTS') == '0':
+			print('warning: oneDNN is disabled (TF_ENABLE_ONEDNN_OPTS=0), set it to 1 before importing TensorFlow')
+		if cpu_supports_bf16():
+			policy = 'mixed_bfloat16'
+		else:
+			print('bfloat16 not supported by this CPU, using float32')
+	mixed_precision.set_global_policy(policy)
+	
+	print('runtime profile:', profile, '- precision policy:', policy,
+		'- threads (intra/inter op):', tf.config.threading.get_intra_op_parallelism_threads(),
+		tf.config.threading.get_inter_op_parallelism_threads())
+	return(policy)
+
+#does the CPU have native bfloat16 instructions? (linux only, False elsewhere)
+def cpu_supports_bf16():
+	if not sys.platform.startswith('linux'):
+		return(False)
+	try:
+		with open('/proc/cpuinfo') as f:
+			flags = f.read()
+	except OSError:
+		return(False)
+	return(('avx512_bf16' in flags) or ('amx_bf16' in flags))
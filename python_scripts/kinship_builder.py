@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:10:00 2026
+"""
+
+""" Function(s) to build kinship matrices from raw genotypes, out of core """
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+from import_functions import KINSHIP_TYPES, MIN_MAF, MAX_MAF, make_filenames, write_cube_metadata
+
+## list of MAF windows (min, max) of the kinship files, in the same order
+## as make_filenames()
+def maf_windows():
+
+    windows = []
+    for lo in MIN_MAF:
+        for hi in MAX_MAF:
+            if float(lo) < float(hi):
+                windows.append((float(lo), float(hi)))
+
+    return windows
+
+
+## stream genotypes from a csv file with markers in rows and samples in columns
+## (first column: marker names, header: sample IDs), genotypes coded as 0/1/2
+## returns the sample IDs and a generator of blocks of shape (samples, markers)
+def genotype_blocks_from_csv(filename, block_size=10000):
+
+    header = pd.read_csv(filename, nrows=0, index_col=0)
+    ids = header.columns.astype(str).to_numpy()
+
+    ## float32 only for the genotype columns, not for the marker names
+    dtypes = {x: np.float32 for x in header.columns}
+
+    def blocks():
+        for chunk in pd.read_csv(filename, index_col=0, chunksize=block_size, dtype=dtypes):
+            yield chunk.to_numpy().T
+
+    return ids, blocks()
+
+
+## stream genotypes from a 2D array (samples, markers), e.g. a np.memmap
+def genotype_blocks_from_array(x, block_size=10000):
+
+    for start in range(0, x.shape[1], block_size):
+        yield np.asarray(x[:, start:(start + block_size)], dtype=np.float32)
+
+
+## additive and dominance codings of a block of genotypes (0/1/2, NaN for missing)
+## returns the centred additive matrix Z, the dominance matrix W and the
+## minor allele frequency of each marker
+## missing genotypes are set to the expected value (0 in both codings)
+def code_genotypes(x):
+
+    p = np.nanmean(x, axis=0) / 2
+    q = 1 - p
+    maf = np.minimum(p, q)
+    missing = np.isnan(x)
+
+    ## additive: x - 2p (VanRaden)
+    z = x - 2 * p
+
+    ## dominance: -2q^2, 2pq, -2p^2 for genotypes 0, 1, 2 (Vitezica et al. 2013)
+    w = np.where(x == 1, 2 * p * q, np.where(x == 2, -2 * q ** 2, -2 * p ** 2))
+
+    z[missing] = 0
+    w[missing] = 0
+
+    return z, w, maf
+
+
+## disjoint MAF intervals (lo, hi) whose unions give the MAF windows: markers
+## are accumulated once per interval, and each window is the sum of its intervals
+## returns the intervals and, for each window, the list of its interval indices
+def maf_intervals(windows):
+
+    bounds = sorted(set([x for w in windows for x in w]))
+    intervals = list(zip(bounds[:-1], bounds[1:]))
+    members = [[j for j, (lo, hi) in enumerate(intervals) if lo >= w[0] and hi <= w[1]]
+               for w in windows]
+
+    return intervals, members
+
+
+## acc += m @ m.T, as a single (multithreaded) BLAS call: numpy uses a symmetric
+## rank-k update for a matrix times its own transpose; tmp is a preallocated
+## buffer of the same shape of acc
+def _accumulate_crossprod(acc, m, tmp):
+
+    np.matmul(m, m.T, out=tmp)
+    acc += tmp
+
+
+## Hadamard product of two kinships, scaled to have average diagonal of 1
+def _epistatic_kinship(k1, k2):
+
+    k = k1 * k2
+    k /= np.trace(k) / k.shape[0]
+
+    return k
+
+
+## build additive, dominance and epistatic (AA, AD, DD) kinships for each
+## MAF window of make_filenames(), streaming the genotypes in marker blocks
+## ids: sample IDs
+## blocks: iterable of genotype blocks of shape (samples, markers)
+## filename: .npy kinship cube to be written (see load_kinship_cube()),
+##   channels are in the same order as make_filenames()
+## the matrix products use the BLAS threads (set OMP_NUM_THREADS or
+## OPENBLAS_NUM_THREADS / MKL_NUM_THREADS before starting python to limit them)
+def build_kinship_cube(ids, blocks, filename, dtype=np.float32):
+
+    n = len(ids)
+    windows = maf_windows()
+    intervals, members = maf_intervals(windows)
+
+    ## numerators and denominators of additive and dominance kinships, per
+    ## disjoint MAF interval
+    acc_a = [np.zeros((n, n)) for x in intervals]
+    acc_d = [np.zeros((n, n)) for x in intervals]
+    den_a = np.zeros(len(intervals))
+    den_d = np.zeros(len(intervals))
+    tmp = np.empty((n, n))
+
+    n_markers = 0
+    for x in blocks:
+        if x.shape[0] != n:
+            raise ValueError("genotype block has {} samples, expected {}".format(x.shape[0], n))
+        z, w, maf = code_genotypes(np.asarray(x, dtype=np.float64))
+        n_markers += x.shape[1]
+
+        for i, (lo, hi) in enumerate(intervals):
+            ## the last interval includes maf = 0.5
+            sel = (maf >= lo) & ((maf < hi) | (hi >= 0.5))
+            if not np.any(sel):
+                continue
+            pq = maf[sel] * (1 - maf[sel])
+            den_a[i] += 2 * np.sum(pq)
+            den_d[i] += np.sum((2 * pq) ** 2)
+            _accumulate_crossprod(acc_a[i], z[:, sel], tmp)
+            _accumulate_crossprod(acc_d[i], w[:, sel], tmp)
+
+        print("{} markers processed".format(n_markers))
+
+    ## an empty window would give a whole channel of NaN
+    for (lo, hi), m in zip(windows, members):
+        if np.sum(den_a[m]) == 0:
+            raise ValueError("no markers in MAF window {}-{}, kinship cube not written".format(lo, hi))
+
+    ## writing straight into the cube, one channel at a time
+    channels = [x[:-len('.csv.gz')] for x in make_filenames()]
+    cube = open_memmap(filename, mode='w+', dtype=dtype, shape=(len(channels), n, n))
+
+    for (lo, hi), m in zip(windows, members):
+        a = sum([acc_a[j] for j in m]) / np.sum(den_a[m])
+        d = sum([acc_d[j] for j in m]) / np.sum(den_d[m])
+        kinships = {'additive': a, 'dominance': d,
+                    'epistasis_AA': _epistatic_kinship(a, a),
+                    'epistasis_AD': _epistatic_kinship(a, d),
+                    'epistasis_DD': _epistatic_kinship(d, d)}
+        for ktype in KINSHIP_TYPES:
+            naam = "kinship_{}_minMAF{}_maxMAF{}".format(ktype, lo, hi)
+            cube[channels.index(naam)] = kinships[ktype]
+
+    cube.flush()
+    del cube
+    write_cube_metadata(filename, ids, channels)
+
+    print("kinship cube of shape {} written to {}".format((len(channels), n, n), filename))
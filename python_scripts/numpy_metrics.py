@@ -0,0 +1,87 @@
+"""
+Created on Mon Oct 19 14:20:00 2026
+"""
+
+""" A collection of metrics for numpy arrays (no tensorflow needed) """
+
+import numpy as np
+
+#pearson's correlation
+def pearson(x, y):
+    
+    xc = x - np.mean(x)
+    yc = y - np.mean(y)
+    
+    return np.sum(xc * yc) / (np.sqrt(np.sum(xc ** 2)) * np.sqrt(np.sum(yc ** 2)))
+
+#Root Mean Square Error
+def rmse(x, y):
+    
+    return np.sqrt(np.mean((x - y) ** 2))
+
+## NDCG: normalised discounted cumulative gain
+## basic version to work with arrays (numpy)
+def ndcg(y, y_hat, k):
+    
+    n = len(y)
+    ## select the k top examples
+    nk = np.round(k*n).astype(int)
+
+    ## decreasing order: use slicing
+    ## arr[start:end:step]
+    y_inds = np.argsort(y)[::-1] ##revert argsort to get decreasing order
+    y_sort_y = y[y_inds]
+    y_hat_inds = np.argsort(y_hat)[::-1]
+    y_sort_y_hat = y[y_hat_inds]
+    
+    seq = np.arange(1.0, nk+1)
+    d = 1/np.log2(seq+1)
+    
+    ## subset arrays
+    sliced_y_hat = y_sort_y_hat[0:nk]
+    sliced_y = y_sort_y[0:nk]
+    
+    num = sum(sliced_y_hat*d)
+    den = sum(sliced_y*d)
+
+    temp = num/den
+    
+    return(temp)
+
+## bulk versions: the metrics are computed at once for many resamples of the
+## same data, idx is an integer matrix (resamples, samples) of indices of y
+## and y_hat, and one value per row of idx is returned
+def pearson_bulk(y, y_hat, idx):
+    
+    a = y[idx]
+    b = y_hat[idx]
+    ac = a - a.mean(axis=1, keepdims=True)
+    bc = b - b.mean(axis=1, keepdims=True)
+    
+    return np.sum(ac * bc, axis=1) / (np.sqrt(np.sum(ac ** 2, axis=1)) * np.sqrt(np.sum(bc ** 2, axis=1)))
+
+def rmse_bulk(y, y_hat, idx):
+    
+    return np.sqrt(np.mean((y[idx] - y_hat[idx]) ** 2, axis=1))
+
+## mean of sqrt((y - y_hat)^2), i.e. the mean absolute error: same definition
+## as keras_metrics.rmse (the rmse / val_rmse of the results tables)
+def mae_bulk(y, y_hat, idx):
+
+    return np.mean(np.abs(y[idx] - y_hat[idx]), axis=1)
+
+def ndcg_bulk(y, y_hat, idx, k):
+    
+    a = y[idx]
+    b = y_hat[idx]
+    nk = np.round(k*idx.shape[1]).astype(int)
+    
+    seq = np.arange(1.0, nk+1)
+    d = 1/np.log2(seq+1)
+    
+    ## y sorted by decreasing y_hat (num) and by decreasing y (den), top nk
+    y_hat_inds = np.argsort(b, axis=1)[:, ::-1][:, 0:nk]
+    num = np.sum(np.take_along_axis(a, y_hat_inds, axis=1) * d, axis=1)
+    den = np.sum(np.sort(a, axis=1)[:, ::-1][:, 0:nk] * d, axis=1)
+    
+    return num/den
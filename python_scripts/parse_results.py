@@ -14,16 +14,61 @@ import re
 import json
 import pandas as pd
 
+from save_results import RESULTS_COLUMNS, config_hash
+
+#%% explicit types of the results columns (see parse_history())
+RESULTS_DTYPES = {'trait': 'category', 'sample_size': 'int32', 'validation_split': 'float32',
+                  'n_epochs': 'int32', 'loss': 'float32', 'pearson': 'float32', 'rmse': 'float32',
+                  'val_loss': 'float32', 'val_pearson': 'float32', 'val_rmse': 'float32',
+                  'max_val_pearson': 'float32', 'nparams': 'int64', 'replicate': 'category',
+                  'config': 'object'}
+
+#%% function to read a results file (as written by writeout_results()) with
+#%% explicit column types, in chunks
+#%% usecols: columns to be read (default all the results columns), the index
+#%% column written by writeout_results() is always skipped
+#%% traits, replicates: if not None, only rows with these values are kept
+#%% (filtering is done chunk by chunk, so that discarded rows are never all in memory)
+def read_results(filepath, usecols = None, traits = None, replicates = None, chunksize = 100000):
+    
+    if usecols is None:
+        usecols = RESULTS_COLUMNS
+    
+    ## filter columns must be read, they are dropped later if not required
+    readcols = list(usecols)
+    for col, values in [('trait', traits), ('replicate', replicates)]:
+        if values is not None and col not in readcols:
+            readcols.append(col)
+    dtypes = {k: v for k, v in RESULTS_DTYPES.items() if k in readcols}
+    
+    chunks = []
+    for chunk in pd.read_csv(filepath, usecols=readcols, dtype=dtypes, chunksize=chunksize):
+        if traits is not None:
+            chunk = chunk[chunk['trait'].isin([str(x) for x in traits])]
+        if replicates is not None:
+            chunk = chunk[chunk['replicate'].isin([str(x) for x in replicates])]
+        chunks.append(chunk)
+    
+    res = pd.concat(chunks, ignore_index=True)
+    res = res[[x for x in readcols if x in usecols]]
+    
+    ## categories may differ across chunks
+    for col in res.columns:
+        if dtypes[col] == 'category':
+            res[col] = res[col].astype('category')
+    
+    return res
+
 #%% function to read results and return a Pandas dataframe for further analysis
 #%% optionally if an outiflepath is passed the dataframe is saved as csv
-def parse_results(filepath, outfilepath = None):
+#%% traits, replicates: optional filters, see read_results()
+def parse_results(filepath, outfilepath = None, traits = None, replicates = None):
     
     basename = os.path.basename(filepath)
     basefolder = os.path.dirname(filepath)
     
     print("Reading file '{}' from folder '{}'".format(basename, basefolder))
-    temp = pd.read_csv(filepath)
-    temp = temp.drop(temp.columns[[0]], axis=1)
+    temp = read_results(filepath, traits=traits, replicates=replicates)
     curr_cols = [x for x in temp.columns]  
     
     print(" - making new columns")
@@ -56,6 +101,10 @@ def parse_results(filepath, outfilepath = None):
             config_res.setdefault(k, []).append(None)
          
 
+    ## canonical hash of the config, the key shared with the predictions
+    hashes = {x: config_hash(json.loads(x)) for x in temp['config'].unique()}
+    temp['config_hash'] = temp['config'].map(hashes)
+    
     temp = temp.drop('config', axis=1)
     
     #putting together fixed and variable columns
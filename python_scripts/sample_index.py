@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:30:00 2026
+"""
+
+""" Function(s) to align samples between kinship cubes and phenotypes """
+
+import numpy as np
+
+## build a sample index: a dictionary mapping each sample ID
+## to its row position (O(1) lookups)
+## IDs are converted to strings, so that IDs read from different
+## files (e.g. int vs str) can be matched
+def make_sample_index(ids):
+
+    index = dict()
+    for pos, naam in enumerate(ids):
+        naam = str(naam)
+        if naam in index:
+            raise ValueError("sample ID '{}' is duplicated".format(naam))
+        index[naam] = pos
+
+    return index
+
+
+## get the row positions of the required sample IDs from a sample index
+## returns a 1d numpy array of integers, in the same order as ids
+def lookup_samples(index, ids):
+
+    ids = [str(x) for x in ids]
+    missing = [x for x in ids if x not in index]
+    if len(missing) > 0:
+        raise KeyError("{} sample IDs not found in the index, e.g. '{}'".format(len(missing), missing[0]))
+
+    return np.array([index[x] for x in ids], dtype=np.int64)
+
+
+## align kinship and phenotype samples
+## kinship_ids, phenotype_ids: sample IDs as returned by stack_kinship(return_ids=True)
+##   (or load_kinship_cube()) and load_phenotypes_and_select_trait(return_ids=True)
+## ids: the samples to be selected; by default all the samples present in both,
+##   in kinship order
+## returns the selected IDs and their row positions in kinship and phenotypes
+def align_samples(kinship_ids, phenotype_ids, ids=None):
+
+    kin_index = make_sample_index(kinship_ids)
+    phen_index = make_sample_index(phenotype_ids)
+
+    if ids is None:
+        ids = [x for x in kin_index.keys() if x in phen_index]
+        print("{} samples in common between kinship ({}) and phenotypes ({})".format(len(ids), len(kin_index), len(phen_index)))
+
+    kin_pos = lookup_samples(kin_index, ids)
+    phen_pos = lookup_samples(phen_index, ids)
+
+    return np.array([str(x) for x in ids]), kin_pos, phen_pos
+
+
+## subset a kinship cube (channels, samples, samples) to the required
+## rows and columns (row positions, e.g. from align_samples())
+## cols defaults to rows, returning a square sub-cube
+## works on memory-mapped cubes (see load_kinship_cube()): only the
+## selected elements are read from disk
+def subset_kinship(k, rows, cols=None):
+
+    if cols is None:
+        cols = rows
+
+    return k[np.ix_(np.arange(k.shape[0]), rows, cols)]
+
+
+## extract the kinship rows of the required samples as examples for the
+## networks: the result has shape (samples, columns, channels), i.e.
+## channels last as expected by Conv2D layers
+## rows are read in sorted order (faster on memory-mapped cubes) and then
+## put back in the required order
+def get_sample_rows(k, rows, cols=None):
+
+    rows = np.asarray(rows)
+    order = np.argsort(rows, kind='stable')
+
+    if cols is None:
+        x = k[:, rows[order], :]
+    else:
+        x = subset_kinship(k, rows[order], cols)
+
+    x = np.moveaxis(x, 0, -1)
+    res = np.empty_like(x)
+    res[order] = x
+
+    return res
@@ -12,9 +12,16 @@ import os
 import re
 import time
 import json
+import hashlib
 import numpy as np
 import pandas as pd
 
+## columns of the results dataframe returned by parse_history()
+RESULTS_COLUMNS = ["trait","sample_size",
+                   "validation_split",
+                   "n_epochs","loss","pearson","rmse","val_loss","val_pearson",
+                   "val_rmse","max_val_pearson","nparams","replicate", "config"]
+
 def make_file_names(trait,config_dict,replicate,extension='png'):
     
     print("making file names for trait ", trait)
@@ -33,6 +40,22 @@ def make_file_names(trait,config_dict,replicate,extension='png'):
     
     return naam
 
+## canonical hash of a config dictionary: the same config always gets the
+## same hash, regardless of key order, tuples vs lists (e.g. after a json
+## round trip, as in the 'config' column of the results) or numpy scalars
+def config_hash(config_dict):
+    
+    def to_builtin(x):
+        if isinstance(x, np.generic):
+            return x.item()
+        if isinstance(x, np.ndarray):
+            return x.tolist()
+        raise TypeError("config value {} of type {} can't be hashed".format(x, type(x)))
+    
+    canonical = json.dumps(config_dict, sort_keys=True, separators=(',', ':'), default=to_builtin)
+    
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
 #get results to be saved
 def parse_history(h, phenotypes, trait, config_dict, max_val_pearson, nparams, replicate):
     
@@ -65,12 +88,7 @@ def parse_history(h, phenotypes, trait, config_dict, max_val_pearson, nparams, r
     #total config in a single column
     temp['config'] = json.dumps(config_dict)
     
-    column_names = ["trait","sample_size",
-                    "validation_split",
-                    "n_epochs","loss","pearson","rmse","val_loss","val_pearson",
-                    "val_rmse","max_val_pearson","nparams","replicate", "config"]
-    
-    temp = temp.reindex(columns=column_names)
+    temp = temp.reindex(columns=RESULTS_COLUMNS)
     
     return temp
 
@@ -96,25 +114,32 @@ def writeout_results(res, filename):
 ## val_x, val_y: features (kinship) and phenotypes in the validation set
 ## sel_val: indices of examples in the validation (~ IDs)
 ## config: Python dictionary with configuration parameters
-def get_predictions(model, val_x, val_y, sel_val, config):
+## replicate: replicate number, as passed to parse_history()
+def get_predictions(model, val_x, val_y, sel_val, config, replicate=None):
     
     ## calculate predictions and make DF with y and y_hat
     predictions = model.predict(val_x)
     predictions = np.concatenate(predictions, axis=0 )
-    tmstmp = round(time.time())
-    temp = pd.DataFrame({'timestamp':tmstmp,'id':sel_val, 'y':val_y, 'y_hat':predictions})
+    preds = make_predictions_dataframe(sel_val, val_y, predictions, config, replicate)
     
-    print('dataframe with {} predictions created'.format(len(temp)))
+    print('dataframe with {} predictions created'.format(len(preds)))
     
-    ## make dataframe with config options
-    d = dict([[k,[str(v)]] for k,v in config.items()])
-    df = pd.DataFrame.from_dict(d)
+    return preds
+
+## put together ids, y, y_hat and configs into the predictions dataframe
+## (timestamp, id, y, y_hat, config_hash, replicate, one column per config
+## option as string); config_hash and replicate match the results table
+## (see parse_results()), so that the two can be joined
+def make_predictions_dataframe(ids, y, y_hat, config, replicate=None):
     
-    ## replicate configs for number of rows (predictions)
-    df = pd.concat([df]*len(temp), ignore_index=True)
+    tmstmp = round(time.time())
+    preds = pd.DataFrame({'timestamp':tmstmp,'id':ids, 'y':y, 'y_hat':y_hat})
+    preds['config_hash'] = config_hash(config)
+    preds['replicate'] = None if replicate is None else str(replicate)
     
-    ## combine y, y_hat and configs into one dataframe
-    preds = pd.concat([temp, df], axis=1)
+    ## config options are the same for all rows (predictions)
+    for k,v in config.items():
+        preds[k] = str(v)
     
     return preds
     
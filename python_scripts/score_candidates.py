@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:40:00 2026
+"""
+
+"""
+Python script that scores new candidate samples with a set of trained models
+The kinship cube (written by save_kinship_cube() or build_kinship_cube()) is
+memory-mapped and read in batches of candidates; each batch is fed to all the
+models, so that ranking a cohort over many models is a single pass on the data
+
+The channels of the cube must be in the order the models were trained on:
+the order stored in the model config ('channels'), if any, otherwise the one
+given with --channels (default: make_filenames() order, as written by
+build_kinship_cube())
+
+Predictions are cached by (model hash, features fingerprint, sample ID) in the
+cache folder, where the fingerprint covers the cube, its sample IDs and the
+feature columns, so that rerunning the script only computes the missing ones
+"""
+
+import argparse
+from import_functions import load_kinship_cube, make_filenames
+from batch_scoring import load_models, score_candidates
+from sample_index import make_sample_index, lookup_samples
+from keras_metrics import pearson, rmse
+
+
+# Create the parser
+parser = argparse.ArgumentParser(description='Score candidates with trained models')
+
+# Add arguments
+parser.add_argument('-m', '--models', type=str, nargs='+', required=True,
+                    help='saved keras models (a json file with the same name, if present, is read as config)')
+parser.add_argument('-k', '--kinship', type=str, required=True,
+                    help='kinship cube (.npy) containing candidates')
+parser.add_argument('-c', '--candidates', type=str, required=True,
+                    help='text file with the IDs of the candidates to be scored, one per line')
+parser.add_argument('-f', '--feature_ids', type=str, required=False, default=None,
+                    help='text file with the IDs of the kinship columns used as features (the training samples of the models), one per line; all columns if not set')
+parser.add_argument('--channels', type=str, required=False, default=None,
+                    help='text file with the channel order the models expect, one per line, for models without channels in their config; make_filenames() order if not set')
+parser.add_argument('-o', '--outfile', type=str, required=True,
+                    help='csv file where predictions are written')
+parser.add_argument('--batch_size', type=int, required=False, default=256,
+                    help='number of candidates scored at once')
+parser.add_argument('--threads', type=int, required=False, default=1,
+                    help='number of models run in parallel')
+parser.add_argument('--cache_dir', type=str, required=False, default=None,
+                    help='folder where predictions are cached (no cache if not set)')
+# Parse the argument
+args = parser.parse_args()
+
+# Print to check arguments values
+print('Number of models:', len(args.models))
+print('Kinship cube is:', args.kinship)
+print('Candidates file is:', args.candidates)
+print('Feature IDs file is:', args.feature_ids)
+print('Channels file is:', args.channels)
+print('Cache folder is:', args.cache_dir)
+
+kinship, kinship_ids, channels = load_kinship_cube(args.kinship)
+
+## reading a file of IDs, one per line
+def read_ids(filename):
+    with open(filename) as f:
+        return [x.strip() for x in f if x.strip() != '']
+
+candidates = read_ids(args.candidates)
+
+## channel order expected by the models
+if args.channels is not None:
+    expected_channels = read_ids(args.channels)
+else:
+    expected_channels = [x[:-len('.csv.gz')] for x in make_filenames()]
+
+## feature columns, as positions in the cube
+cols = None
+if args.feature_ids is not None:
+    cols = lookup_samples(make_sample_index(kinship_ids), read_ids(args.feature_ids))
+
+models = load_models(args.models, custom_objects={'pearson': pearson, 'rmse': rmse})
+preds = score_candidates(models, kinship, kinship_ids, candidates, channels,
+                         expected_channels=expected_channels, cols=cols,
+                         batch_size=args.batch_size, n_threads=args.threads,
+                         cache_dir=args.cache_dir)
+
+preds.to_csv(args.outfile)
+print("{} predictions written to {}".format(len(preds), args.outfile))
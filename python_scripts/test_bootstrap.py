@@ -0,0 +1,55 @@
+""" Tests for bootstrap.py (run with pytest from this folder) """
+
+import types
+import numpy as np
+import pandas as pd
+
+from bootstrap import bootstrap_metrics, bootstrap_ci, attach_ci
+from save_results import parse_history, writeout_results, make_predictions_dataframe
+from parse_results import parse_results
+
+def test_independent_of_chunk_size():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=80)
+    y_hat = y + rng.normal(size=80)
+    a = bootstrap_metrics(y, y_hat, n_boot=250, seed=1, chunk_size=100)
+    b = bootstrap_metrics(y, y_hat, n_boot=250, seed=1, chunk_size=50)
+    c = bootstrap_metrics(y, y_hat, n_boot=250, seed=1, chunk_size=30, n_jobs=2)
+    for m in a.keys():
+        assert len(a[m]) == 250
+        assert np.array_equal(a[m], b[m])
+        assert np.array_equal(a[m], c[m])
+
+def test_groups_resampled_independently():
+    y = np.arange(40, dtype=float)
+    preds = pd.DataFrame({'g': ['a'] * 40 + ['b'] * 40, 'y': np.tile(y, 2), 'y_hat': np.tile(y, 2) ** 2})
+    ci = bootstrap_ci(preds, group_cols=['g'], n_boot=100, seed=3)
+    assert ci.loc[0, 'val_rmse_ci_low'] != ci.loc[1, 'val_rmse_ci_low']
+    assert ci.loc[0, 'val_true_rmse_ci_low'] != ci.loc[1, 'val_true_rmse_ci_low']
+    ## a single pool for all the groups gives the same intervals
+    pd.testing.assert_frame_equal(ci, bootstrap_ci(preds, group_cols=['g'], n_boot=100, seed=3, n_jobs=2))
+
+def test_attach_to_parsed_results(tmp_path):
+    rng = np.random.default_rng(0)
+    configs = [{'val_split': 0.2, 'conv_layers': [32, 64], 'conv_padding': 'same', 'input_shape': (10, 15, 1)},
+               {'val_split': 0.2, 'conv_layers': [16], 'conv_padding': 'valid', 'input_shape': (10, 15, 1)}]
+    resfile = str(tmp_path / 'results.csv')
+    preds = []
+    for config in configs:
+        for replicate in ['1', '2']:
+            ## a fake keras history with the metrics of parse_history()
+            values = {m: list(rng.random(12)) for m in ['loss', 'pearson', 'rmse', 'val_loss', 'val_pearson', 'val_rmse']}
+            h = types.SimpleNamespace(history=values, params={'epochs': 12})
+            writeout_results(parse_history(h, np.zeros(50), 'trait1', config, 0.5, 1000, replicate), resfile)
+
+            y = rng.normal(size=10)
+            preds.append(make_predictions_dataframe(np.arange(10), y, y + rng.normal(size=10), config, replicate))
+    preds = pd.concat(preds, ignore_index=True)
+
+    res = parse_results(resfile)
+    ci = bootstrap_ci(preds, n_boot=100, seed=0)
+    res = attach_ci(res, ci)
+
+    assert len(res) == 4
+    assert not res['val_pearson_ci_low'].isna().any()
+    assert (res['val_rmse_ci_low'] <= res['val_rmse_ci_high']).all()
@@ -0,0 +1,51 @@
+""" Tests for kinship_builder.py (run with pytest from this folder) """
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from import_functions import load_kinship_cube
+from kinship_builder import genotype_blocks_from_csv, genotype_blocks_from_array, build_kinship_cube
+
+## random genotypes (samples, markers), with MAF spread over the whole range
+def random_genotypes(n_samples=50, n_markers=300, seed=0):
+    rng = np.random.default_rng(seed)
+    p = rng.uniform(0.02, 0.98, size=n_markers)
+    return rng.binomial(2, p, size=(n_samples, n_markers)).astype(np.float32)
+
+## additive kinship computed directly, Z Z' / 2 sum(pq), on the markers of a MAF window
+def direct_additive(x, lo, hi):
+    x = x.astype(np.float64)
+    p = x.mean(axis=0) / 2
+    maf = np.minimum(p, 1 - p)
+    sel = (maf >= lo) & ((maf < hi) | (hi >= 0.5))
+    z = x[:, sel] - 2 * p[sel]
+    return z @ z.T / (2 * np.sum(p[sel] * (1 - p[sel])))
+
+def test_csv_round_trip(tmp_path):
+    x = random_genotypes()
+    ids = ['s{}'.format(i) for i in range(x.shape[0])]
+    markers = ['m{}'.format(i) for i in range(x.shape[1])]
+    genofile = tmp_path / 'genotypes.csv'
+    pd.DataFrame(x.T.astype(int), index=markers, columns=ids).to_csv(genofile)
+
+    csv_ids, blocks = genotype_blocks_from_csv(str(genofile), block_size=70)
+    assert list(csv_ids) == ids
+
+    cubefile = str(tmp_path / 'cube.npy')
+    build_kinship_cube(csv_ids, blocks, cubefile, dtype=np.float64)
+    k, cube_ids, channels = load_kinship_cube(cubefile)
+
+    assert list(cube_ids) == ids
+    for lo, hi in [(0.01, 0.05), (0.01, 0.5), (0.05, 0.5)]:
+        a = k[channels.index('kinship_additive_minMAF{}_maxMAF{}'.format(lo, hi))]
+        assert np.allclose(a, direct_additive(x, lo, hi))
+    assert not np.isnan(k).any()
+
+def test_empty_maf_window(tmp_path):
+    ## all markers at MAF 0.5: no marker in the 0.01-0.05 window
+    x = np.tile(np.array([[0], [1], [2], [1]], dtype=np.float32), (1, 20))
+    cubefile = tmp_path / 'cube.npy'
+    with pytest.raises(ValueError):
+        build_kinship_cube(['a', 'b', 'c', 'd'], genotype_blocks_from_array(x, 7), str(cubefile))
+    assert not cubefile.exists()
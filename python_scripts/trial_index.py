@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:10:00 2026
+"""
+
+""" Function(s) to keep track of completed trials (trait, config, replicate) """
+
+#%% libraries
+import os
+import json
+import pandas as pd
+
+from save_results import config_hash
+from parse_results import read_results
+
+#%% columns of the index file
+TRIAL_COLUMNS = ['trait', 'config_hash', 'replicate']
+
+#%% key of a trial
+def trial_key(trait, config_dict, replicate):
+    
+    return (str(trait), config_hash(config_dict), str(replicate))
+
+#%% build the index of completed trials from existing results files
+#%% (as written by writeout_results()); only trait, config and replicate are read
+#%% returns a set of trial keys, saved to index_file if passed
+def build_trial_index(results_files, index_file = None):
+    
+    index = set()
+    hashes = dict()
+    for filepath in results_files:
+        print("Indexing trials in '{}'".format(filepath))
+        res = read_results(filepath, usecols=['trait', 'replicate', 'config'])
+        
+        ## each distinct config string is hashed once
+        for cfg in res['config'].unique():
+            if cfg not in hashes:
+                hashes[cfg] = config_hash(json.loads(cfg))
+        
+        keys = zip(res['trait'].astype(str), res['config'].map(hashes), res['replicate'].astype(str))
+        index.update(keys)
+    
+    print(" - {} completed trials found".format(len(index)))
+    
+    if index_file is not None:
+        save_trial_index(index, index_file)
+    
+    return index
+
+#%% save the index as a csv file
+def save_trial_index(index, index_file):
+    
+    basedir = os.path.dirname(index_file)
+    if basedir != '':
+        os.makedirs(basedir, exist_ok=True)
+    
+    pd.DataFrame(sorted(index), columns=TRIAL_COLUMNS).to_csv(index_file, index=False)
+
+#%% load the index from a csv file (an empty index if the file does not exist)
+def load_trial_index(index_file):
+    
+    if not os.path.exists(index_file):
+        return set()
+    
+    temp = pd.read_csv(index_file, dtype=str)
+    
+    return set(zip(temp['trait'], temp['config_hash'], temp['replicate']))
+
+#%% has this trial been completed?
+def is_completed(index, trait, config_dict, replicate):
+    
+    return trial_key(trait, config_dict, replicate) in index
+
+#%% add a trial to the index, appending it to index_file too
+def mark_completed(index, index_file, trait, config_dict, replicate):
+    
+    key = trial_key(trait, config_dict, replicate)
+    index.add(key)
+    
+    pd.DataFrame([key], columns=TRIAL_COLUMNS).to_csv(index_file, mode='a', index=False,
+                                                      header=not os.path.exists(index_file))
+
+#%% keep only the trials (list of (trait, config_dict, replicate)) that are not completed
+def pending_trials(index, trials):
+    
+    return [x for x in trials if not is_completed(index, x[0], x[1], x[2])]
+
+#%% entry point for a training run: if the trial is in the index it's skipped
+#%% (returns None), otherwise train_function() is called and, once it's done,
+#%% the trial is marked as completed; returns what train_function() returns
+def run_if_pending(index_file, trait, config_dict, replicate, train_function, index = None):
+    
+    if index is None:
+        index = load_trial_index(index_file)
+    
+    if is_completed(index, trait, config_dict, replicate):
+        print("trial already completed, skipping: trait {}, config {}, replicate {}".format(
+            trait, config_hash(config_dict), replicate))
+        return None
+    
+    res = train_function()
+    mark_completed(index, index_file, trait, config_dict, replicate)
+    
+    return res
+
+#%% a folder name unique to the trial, e.g. to be used as checkpoint_dir in
+#%% train_with_checkpoints(), so that a rerun resumes the right trial
+def trial_dir(base_dir, trait, config_dict, replicate):
+    
+    return os.path.join(base_dir, '_'.join(trial_key(trait, config_dict, replicate)))